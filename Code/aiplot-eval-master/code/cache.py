@@ -0,0 +1,32 @@
+import copy
+import hashlib
+from collections import OrderedDict
+
+
+class LLMCache:
+    """
+    LLM响应缓存：提示词sha256精确匹配（内存LRU）
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._exact = OrderedDict()  # sha256 -> 响应
+
+    def get(self, namespace, prompt):
+        """查询缓存，未命中返回None"""
+        key = self._key(namespace, prompt)
+        if key not in self._exact:
+            return None
+        self._exact.move_to_end(key)
+        return copy.deepcopy(self._exact[key])
+
+    def set(self, namespace, prompt, response):
+        """写入缓存"""
+        key = self._key(namespace, prompt)
+        self._exact[key] = copy.deepcopy(response)
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.max_size:
+            self._exact.popitem(last=False)
+
+    def _key(self, namespace, prompt):
+        return hashlib.sha256((namespace + "\n" + prompt).encode("utf-8")).hexdigest()
@@ -1,4 +1,6 @@
+import asyncio
 import json
+from code.cache import LLMCache
 from code.config import Config
 
 import instructor
@@ -7,8 +9,11 @@ from pydantic import BaseModel
 
 
 class LLMProvider:
-    def __init__(self, provider="openailike"):
+    def __init__(self, provider="openailike", cache: LLMCache = None):
         self.provider = provider
+        self.cache = cache
+        self._client = None
+        self._client_loop = None
 
     async def infer(
         self,
@@ -16,15 +21,40 @@ class LLMProvider:
         prompt: str = None,
         response_model: BaseModel = None,
         max_tokens=1024,
+        cache_key: str = None,
     ):
-        # 通用LLM推理
-        if self.provider == "openailike":
-            client = instructor.from_openai(
+        # 传入cache_key时启用响应缓存，cache_key用于区分同一提示词下的不同采样
+        if self.cache is None or cache_key is None:
+            return await self._infer(model, prompt, response_model, max_tokens)
+
+        namespace = "{model}:{response_model}:{cache_key}".format(
+            model=model,
+            response_model=getattr(response_model, "__name__", None),
+            cache_key=cache_key,
+        )
+        response = self.cache.get(namespace, prompt)
+        if response is None:
+            response = await self._infer(model, prompt, response_model, max_tokens)
+            self.cache.set(namespace, prompt, response)
+        return response
+
+    def _get_client(self):
+        # 复用同一客户端及其连接池，避免每次请求重新建立连接；连接池绑定事件循环，换用新的事件循环时重建
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = instructor.from_openai(
                 AsyncOpenAI(
                     base_url=Config.OPENAI_BASE_URL, api_key=Config.OPENAI_API_KEY
                 ),
                 mode=instructor.Mode.JSON,
             )
+            self._client_loop = loop
+        return self._client
+
+    async def _infer(self, model, prompt, response_model, max_tokens):
+        # 通用LLM推理
+        if self.provider == "openailike":
+            client = self._get_client()
 
             response = await client.chat.completions.create(
                 max_tokens=max_tokens,
@@ -45,12 +75,7 @@ class LLMProvider:
             
         # 剧本生成器
         elif self.provider == "scriptwriter":
-            client = instructor.from_openai(
-                AsyncOpenAI(
-                    base_url=Config.OPENAI_BASE_URL, api_key=Config.OPENAI_API_KEY
-                ),
-                mode=instructor.Mode.JSON,
-            )
+            client = self._get_client()
 
             response = await client.chat.completions.create(
                 max_tokens=max_tokens,
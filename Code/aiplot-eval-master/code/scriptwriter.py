@@ -1,22 +1,53 @@
 import asyncio
 from abc import ABC, abstractmethod
+from code.cache import LLMCache
 from code.config import Config
 from code.llm import LLMProvider
-import json
+import copy
+import hashlib
+import logging
+import orjson
 from pydantic import BaseModel, Field, RootModel
 from typing import Dict, List, Union, Optional
 import math
-import random
+
+logger = logging.getLogger(__name__)
+
+def dumps(obj, option=0):
+    """使用orjson序列化为字符串（保留中文，允许非字符串键）"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | option).decode()
+
+def state_key(state):
+    """场景状态的稳定哈希键，与字典键的插入顺序无关"""
+    return hashlib.blake2b(
+        orjson.dumps(state, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS),
+        digest_size=16,
+    ).digest()
+
+async def gather_or_cancel(*aws):
+    """并发执行并按顺序返回结果，任一失败时取消其余任务并等待其结束"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 class MCTSNode:
     """蒙特卡洛树搜索节点"""
+    __slots__ = ('state', 'parent', 'children', 'visits', 'pending', 'score', 'depth', 'is_terminal', '_log_visits_cache')
+
     def __init__(self, state, parent=None):
         self.state = state  # 当前场景状态
         self.parent = parent  # 父节点
+        self.depth = 0 if parent is None else parent.depth + 1  # 节点深度
         self.children = []  # 子节点列表
         self.visits = 0  # 访问次数
+        self.pending = 0  # 进行中的访问次数（虚拟损失）
         self.score = 0  # 累计评分
-        self.uct = 0  # UCT值
+        self.is_terminal = False  # 是否已不可再扩展（达到最大深度）
+        self._log_visits_cache = (1, 0.0)  # (总访问次数, 其对数)
 
     def expand(self, possible_states):
         """扩展节点"""
@@ -28,96 +59,187 @@ class MCTSNode:
         """更新节点统计信息"""
         self.visits += 1
         self.score += score
-        if self.parent:
-            self.uct = (self.score / self.visits) + math.sqrt(2 * math.log(self.parent.visits) / self.visits)
 
-    def select_best_child(self, exploration_weight=1.41):
-        """选择最佳子节点"""
-        if not self.children:
+    def select_best_child(self, exploration_weight=1.41, children=None):
+        """选择最佳子节点（进行中的访问计入分母，使并发选择分散到不同分支）"""
+        if children is None:
+            children = self.children
+        if not children:
             return None
-        return max(self.children, key=lambda c: c.uct)
+        # 探索项分子对所有子节点相同，只计算一次
+        exploration = exploration_weight * math.sqrt(self._log_visits())
+
+        def uct(child):
+            visits = child.visits + child.pending
+            if visits == 0:
+                return 0
+            return child.score / visits + exploration / math.sqrt(visits)
+
+        return max(children, key=uct)
+
+    def _log_visits(self):
+        """总访问次数（含进行中）的对数，次数未变时复用上次结果"""
+        visits = max(self.visits + self.pending, 1)
+        if self._log_visits_cache[0] != visits:
+            self._log_visits_cache = (visits, math.log(visits))
+        return self._log_visits_cache[1]
 
 class MCTSGenerator:
     """蒙特卡洛树搜索生成器"""
-    def __init__(self, scriptwriter_agent):
+    def __init__(self, scriptwriter_agent, branching=2, max_parallel=4, early_stop_threshold=4.5):
         self.agent = scriptwriter_agent
         self.max_iterations = 5  # 迭代次数
         self.exploration_weight = 1.41
         self.max_depth = 3  # 限制搜索深度
-        self.cache = {}  # 添加缓存
+        self.branching = branching  # 每次扩展生成的场景变体数量
+        self.max_parallel = max_parallel  # 同时进行的迭代数量上限
+        self.early_stop_threshold = early_stop_threshold  # 最佳场景平均评分达到该值时提前结束
+        self.cache = {}  # 添加缓存（场景 -> 评分）
+        self.model_calls = 0
 
     async def generate_scene(self, script, gamelog):
-        """使用MCTS生成场景"""
+        """使用MCTS生成场景（叶并行：多个迭代的模型调用并发进行）"""
         root = MCTSNode(None)
         iteration_count = 0
-        model_calls = 0
+        self.model_calls = 0
+        # 剧本和玩家历史在整个搜索过程中不变，只序列化一次
+        context = self.agent._format_context(script, gamelog)
         
         while iteration_count < self.max_iterations:
-            # 选择阶段
-            node = self._select(root)
-            depth = 0
-            current = node
-            while current.parent:
-                depth += 1
-                current = current.parent
-            
-            # 如果达到最大深度，跳过扩展
-            if depth >= self.max_depth:
-                continue
+            # 选择阶段：在并发上限内选出多个叶节点，并施加虚拟损失使后续选择偏向其他分支
+            in_flight = {}
+            while (
+                len(in_flight) < self.max_parallel
+                and iteration_count + len(in_flight) < self.max_iterations
+            ):
+                node = self._select(root)
+                # 整棵树均已到达最大深度，或该叶节点已在本批次中（等待其结果返回后再继续选择）
+                if node is None or node in in_flight.values():
+                    break
+                # 如果达到最大深度，标记为终止节点并重新选择
+                if node.depth >= self.max_depth:
+                    node.is_terminal = True
+                    continue
                 
-            # 扩展阶段
-            if node.visits > 0:
-                possible_states = await self._get_possible_states(node.state, script, gamelog)
-                model_calls += len(possible_states)  # 记录生成调用
-                node.expand(possible_states)
-                if node.children:
-                    node = random.choice(node.children)
+                self._apply_virtual_loss(node, 1)
+                task = asyncio.create_task(self._rollout(
+                    node, iteration_count + len(in_flight), context
+                ))
+                in_flight[task] = node
             
-            # 模拟阶段
-            cache_key = str(node.state)
-            if cache_key in self.cache:
-                score = self.cache[cache_key]
-            else:
-                score = await self._simulate(node.state, script, gamelog)
-                model_calls += 1  # 记录评估调用
-                self.cache[cache_key] = score
+            # 没有可搜索的节点，提前结束
+            if not in_flight:
+                break
             
-            # 反向传播阶段
-            while node:
-                node.update(score)
-                node = node.parent
-                
-            iteration_count += 1
-            print(f'迭代 {iteration_count}/{self.max_iterations}, 模型调用次数: {model_calls}')
+            # 按完成顺序整合结果
+            try:
+                for next_done in asyncio.as_completed(in_flight):
+                    node, child_scores, score = await next_done
+                    
+                    # 反向传播阶段
+                    for child, child_score in child_scores:
+                        child.update(child_score)
+                    while node:
+                        node.update(score)
+                        node = node.parent
+                    
+                    iteration_count += 1
+                    print(f'迭代 {iteration_count}/{self.max_iterations}, 模型调用次数: {self.model_calls}')
+            finally:
+                # 某次迭代出错时取消其余仍在进行的迭代，并等待其结束，避免遗留后台LLM调用
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            
+            # 最佳场景已被多次访问且平均评分足够高，提前结束（按平均评分选取，不计探索项）
+            best_node = root.select_best_child(exploration_weight=0)
+            if (
+                best_node
+                and best_node.visits >= 2
+                and best_node.score / best_node.visits >= self.early_stop_threshold
+            ):
+                print(f'最佳场景平均评分已达 {best_node.score / best_node.visits:.2f}，提前结束搜索')
+                break
         
         # 选择最佳场景
         best_node = root.select_best_child()
         return best_node.state if best_node else None
 
-    def _select(self, node):
-        """选择阶段"""
+    async def _rollout(self, node, iteration, context):
+        """执行一次迭代的扩展与模拟阶段，返回各子节点评分及需反向传播的节点、评分"""
+        child_scores = []
+        try:
+            # 扩展阶段
+            if node.visits > 0:
+                possible_states = await self._get_possible_states(node.state, context, iteration)
+                node.expand(possible_states)
+            
+            # 模拟阶段：并发模拟全部子节点，以最优子节点评分向上回传
+            if node.children:
+                scores = await gather_or_cancel(*(self._simulate(c.state, context) for c in node.children))
+                child_scores = list(zip(node.children, scores))
+                score = max(scores)
+            else:
+                score = await self._simulate(node.state, context)
+        finally:
+            # 移除虚拟损失，之后由反向传播写入真实统计
+            self._apply_virtual_loss(node, -1)
+        return node, child_scores, score
+
+    def _apply_virtual_loss(self, node, pending):
+        """沿路径施加（或撤销）虚拟损失：只计入进行中的访问，不增加评分"""
+        while node:
+            node.pending += pending
+            node = node.parent
+
+    def _select(self, root):
+        """选择阶段，跳过终止节点；整棵树均已终止时返回None"""
+        node = root
         while node.children:
-            if not all(child.visits > 0 for child in node.children):
-                return random.choice([c for c in node.children if c.visits == 0])
-            node = node.select_best_child(self.exploration_weight)
+            # 单次遍历：返回首个未访问的子节点，同时收集非终止子节点
+            children = []
+            for child in node.children:
+                if child.is_terminal:
+                    continue
+                if child.visits + child.pending == 0:
+                    return child
+                children.append(child)
+            if not children:
+                # 子节点均已终止，该节点同样不可再扩展，从根节点重新选择
+                node.is_terminal = True
+                if node is root:
+                    return None
+                node = root
+                continue
+            node = node.select_best_child(self.exploration_weight, children)
         return node
 
-    async def _get_possible_states(self, current_state, script, gamelog):
+    async def _get_possible_states(self, current_state, context, iteration=0):
         """获取可能的场景状态"""
-        # 使用LLM生成多个可能的场景变体
+        # 使用LLM并发生成多个可能的场景变体，生成时一并给出评分
+        # 以迭代序号和变体序号区分缓存，避免同一提示词的各个变体命中同一条缓存
+        results = await gather_or_cancel(*(
+            self.agent._generate_and_evaluate_scene(context, variant=f"{iteration}-{i}")
+            for i in range(self.branching)
+        ))
+        self.model_calls += len(results)  # 记录生成（含评估）调用
         states = []
-        for _ in range(2):  # 减少变体数量
-            state = await self.agent._generate_scene(script, gamelog)
+        for state, score in results:
+            self.cache[state_key(state)] = score
             states.append(state)
         return states
 
-    async def _simulate(self, state, script, gamelog):
+    async def _simulate(self, state, context):
         """模拟阶段"""
         if not state:
             return 0
-        # 评估场景质量
-        score = await self.agent._evaluate_scene(state, script, gamelog)
-        return score
+        # 扩展时已随场景生成评分，直接查缓存
+        cache_key = state_key(state)
+        if cache_key not in self.cache:
+            # 评估场景质量
+            self.cache[cache_key] = await self.agent._evaluate_scene(state, context)
+            self.model_calls += 1  # 记录评估调用
+        return self.cache[cache_key]
 
 
 
@@ -140,6 +262,11 @@ class EvaluationOutput(BaseModel):
     score: int = Field(ge=0, le=5)
     reason: str
 
+class SceneWithEvalOutput(BaseModel):
+    """场景及自评输出模型"""
+    scene: SceneOutput
+    evaluation: EvaluationOutput
+
 class BaseScriptwriterAgent(ABC):
     def __init__(
         self,
@@ -147,7 +274,10 @@ class BaseScriptwriterAgent(ABC):
         llm_provider=Config.DRAMA_AGENT_MODEL_PROVIDER,
     ):
         self._llm_model = llm_model
-        self._llm_provider = LLMProvider(provider=llm_provider)
+        self._llm_provider = LLMProvider(
+            provider=llm_provider,
+            cache=LLMCache(),
+        )
 
     async def gen_new_full_script(self) -> dict:
         """
@@ -186,20 +316,26 @@ class ScriptwriterAgent(BaseScriptwriterAgent):
         else:
             # 如果MCTS生成失败，回退到原始生成方法
             print('MCTS生成失败，回退到原始生成方法')
-            return await self._generate_scene(script, gamelog)
+            return await self._generate_scene(self._format_context(script, gamelog))
+
+    def _format_context(self, script, gamelog):
+        """
+        序列化提示词共用的剧本和玩家历史
+        """
+        return {
+            "script": dumps(script),
+            "plot_history": dumps(gamelog.get("plot_history", [])),
+            "clue_history": dumps(gamelog.get("clue_history", [])),
+            "hint_history": dumps(gamelog.get("hint_history", [])),
+            "interaction_history": dumps(gamelog.get("interaction_history", [])),
+        }
 
-    async def _generate_scene(self, script, gamelog):
+    async def _generate_scene(self, context):
         """
-        使用LLM生成新的场景剧本
+        使用LLM生成新的场景剧本，context为_format_context序列化后的提示词字段
         """
         # 准备提示词
-        prompt = SCENE_GEN_PROMPT_TEMP.format(
-            script=json.dumps(script, ensure_ascii=False),
-            plot_history=json.dumps(gamelog.get("plot_history", []), ensure_ascii=False),
-            clue_history=json.dumps(gamelog.get("clue_history", []), ensure_ascii=False),
-            hint_history=json.dumps(gamelog.get("hint_history", []), ensure_ascii=False),
-            interaction_history=json.dumps(gamelog.get("interaction_history", []), ensure_ascii=False)
-        )
+        prompt = SCENE_GEN_PROMPT_TEMP.format(**context)
         
         # 调用LLM生成场景
         response = await self._llm_provider.infer(
@@ -207,131 +343,148 @@ class ScriptwriterAgent(BaseScriptwriterAgent):
             prompt=prompt,
             response_model=SceneOutput
         )
-        print('新场景的结果：')
-        print(json.dumps(response, ensure_ascii=False, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('新场景的结果：\n%s', dumps(response, orjson.OPT_INDENT_2))
         
         try:
             # 直接返回字典
             return response
         except Exception as e:
             print(f"场景生成失败：{str(e)}")
-            return await self._dummy_gen_new_scene_script(script, gamelog)
+            return await self._dummy_gen_new_scene_script()
 
-    async def _evaluate_scene(self, new_scene, script, gamelog):
+    async def _evaluate_scene(self, new_scene, context) -> int:
         """
-        评估新生成的场景
+        评估新生成的场景，context为_format_context序列化后的提示词字段
         """
         # 准备评估提示词
         prompt = SCENE_EVAL_PROMPT_TEMP.format(
-            script=json.dumps(script, ensure_ascii=False),
-            plot_history=json.dumps(gamelog.get("plot_history", []), ensure_ascii=False),
-            clue_history=json.dumps(gamelog.get("clue_history", []), ensure_ascii=False),
-            hint_history=json.dumps(gamelog.get("hint_history", []), ensure_ascii=False),
-            interaction_history=json.dumps(gamelog.get("interaction_history", []), ensure_ascii=False),
-            new_scene=json.dumps(new_scene, ensure_ascii=False)
+            **context,
+            new_scene=dumps(new_scene)
         )
         
         # 调用LLM进行评估
         response = await self._llm_provider.infer(
             model=self._llm_model,
             prompt=prompt,
-            response_model=EvaluationOutput
+            response_model=EvaluationOutput,
+            cache_key="evaluate",
         )
-        print('评分的结果：')
-        print(json.dumps(response, ensure_ascii=False, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('评分的结果：\n%s', dumps(response, orjson.OPT_INDENT_2))
         
-        try:
-            # 直接获取评分
-            return response.get("score", 0)
-        except Exception as e:
-            print(f"场景评估失败：{str(e)}")
-            return 0
+        # 评分已由EvaluationOutput校验，评估失败时直接抛出，不以0分掩盖
+        return response["score"]
+
+    async def _generate_and_evaluate_scene(self, context, variant=None):
+        """
+        单次LLM调用同时生成新场景并给出评分，返回(场景, 评分)
+        """
+        # 准备提示词
+        prompt = SCENE_GEN_EVAL_PROMPT_TEMP.format(**context)
+        
+        # 调用LLM生成并评估场景，输出同时包含场景与评分，需放宽长度上限
+        response = await self._llm_provider.infer(
+            model=self._llm_model,
+            prompt=prompt,
+            response_model=SceneWithEvalOutput,
+            max_tokens=2048,
+            cache_key=variant,
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('新场景及评分的结果：\n%s', dumps(response, orjson.OPT_INDENT_2))
         
+        return response["scene"], response["evaluation"]["score"]
 
     async def _dummy_gen_new_scene_script(self, script=None, gamelog=None):
- 
+        """
+        返回固定的示例场景，调用方（如DramaAgent）会修改返回结果，因此返回副本
+        """
         await asyncio.sleep(1)
-        return {
-            "场景老王烧饼铺": {
-                "场景": "地点：老王烧饼铺\\n时间：上午十点\\n你来到隔壁老王的烧饼铺，蒸笼冒着热气却未见武大郎的摊位。",
-                "人物": "老王。隔壁老王四十余岁，满脸横肉，手臂有烫伤疤痕。因摊位纠纷与武大郎积怨已久，近日正在争夺早市黄金摊位。",
-                "情节链": [
-                    "潘金莲试探老王与武大郎的矛盾",
-                    "老王察觉潘金莲异常神色",
-                    "潘金莲试图用砒霜栽赃老王",
-                    "老王反咬潘金莲通奸之事",
-                    "烧饼铺伙计目击争执",
-                ],
-                "流": {
-                    "潘金莲试探老王与武大郎的矛盾": [
-                        "老王（擦着擀面杖）：武大家的？稀客啊，你家那矮子今天怎舍得让娇妻抛头露面？",
-                        "潘金莲：王大哥说笑了，奴家来问问前日您说要买我家祖传和面方子的事...",
-                        {"关键提示": "老王右手虎口有新鲜抓痕"},
-                    ],
-                    "老王察觉潘金莲异常神色": [
-                        "老王（突然逼近）：你袖口沾的可是石灰？今早西巷棺材铺刚运走三袋。",
-                        "潘金莲（后退半步）：王大哥真会说笑，这是...揉面沾的面粉。",
-                        {"收集关键线索": "老王注意到潘金莲袖口异常"},
-                    ],
-                    "潘金莲试图用砒霜栽赃老王": [
-                        "潘金莲（掏出纸包）：其实奴家是想问问，王大哥面案下藏的砒霜可要分些与奴家？",
-                        "老王（拍案而起）：好个毒妇！昨日武大说要去县衙告我强占摊位，今早就...",
-                        {"关键提示": "蒸笼后闪过烧饼铺伙计的身影"},
-                    ],
-                    "老王反咬潘金莲通奸之事": [
-                        "老王（阴笑）：上月廿八未时，西门大官人的马车在你家后巷停了一炷香。",
-                        "潘金莲（脸色煞白）：你...你血口喷人！",
-                        {"收集关键线索": "老王掌握潘金莲与西门庆私会证据"},
-                    ],
-                    "烧饼铺伙计目击争执": [
-                        "伙计（突然插话）：掌柜的，武家娘子方才在面缸旁鬼鬼祟祟...",
-                        "潘金莲（猛然转身）：休得胡言！",
-                        {"关键提示": "面缸边缘有白色粉末洒落"},
-                    ],
-                },
-                "交互": {
-                    "对话": [
-                        "潘金莲提及摊位纠纷$语义1 (武大郎这两天和隔壁老王产生过巨大矛盾)",
-                        "老王暗示知晓武大郎死亡真相$语义2 (老王注意到潘金莲袖口异常)",
-                        "烧饼铺伙计指认可疑行为$语义3 (面缸边缘有白色粉末洒落)",
-                    ],
-                    "动作选择": [
-                        "摔碎毒药瓶诬陷老王$1 (潘金莲试图用砒霜栽赃老王)",
-                        "谎称武大郎去县衙告状$2 (潘金莲提及摊位纠纷$语义1)",
-                        "用西门庆势力威胁老王$3 (老王掌握潘金莲与西门庆私会证据)",
-                        "借口取面粉查看面缸$4 (烧饼铺伙计指认可疑行为$语义3)",
-                    ],
-                },
-                "触发": {
-                    "摔碎毒药瓶诬陷老王$1": {
-                        "叙事": "你故意打翻砒霜纸包，白色粉末飘向正在发酵的面团。",
-                        "收集关键线索": "老王的面团沾染不明粉末",
-                        "跳转": "结局18",
-                    },
-                    "谎称武大郎去县衙告状$2": {
-                        "叙事": "你声称武大郎正在县衙办理摊位过户文书，老王抄起砍骨刀冲向衙门。",
-                        "收集关键线索": "老王持凶器前往县衙",
-                        "跳转": "场景大街",
-                    },
-                    "用西门庆势力威胁老王$3": {
-                        "叙事": "你暗示西门庆会处理多嘴之人，老王狂笑着掀开藏着账本的面缸。",
-                        "收集关键线索": "发现老王走私面粉的暗账",
-                        "跳转": "场景西门庆家",
-                    },
-                    "借口取面粉查看面缸$4": {
-                        "叙事": "你假装查看面粉质量，将武大郎的鞋底碎布塞入缸底。",
-                        "收集关键线索": "老王面缸发现武大郎衣物残片",
-                        "跳转": "场景衙门",
-                    },
-                },
+        return copy.deepcopy(_DUMMY_SCENE_TEMPLATE)
+
+
+_DUMMY_SCENE_TEMPLATE = {
+    "场景老王烧饼铺": {
+        "场景": "地点：老王烧饼铺\\n时间：上午十点\\n你来到隔壁老王的烧饼铺，蒸笼冒着热气却未见武大郎的摊位。",
+        "人物": "老王。隔壁老王四十余岁，满脸横肉，手臂有烫伤疤痕。因摊位纠纷与武大郎积怨已久，近日正在争夺早市黄金摊位。",
+        "情节链": [
+            "潘金莲试探老王与武大郎的矛盾",
+            "老王察觉潘金莲异常神色",
+            "潘金莲试图用砒霜栽赃老王",
+            "老王反咬潘金莲通奸之事",
+            "烧饼铺伙计目击争执",
+        ],
+        "流": {
+            "潘金莲试探老王与武大郎的矛盾": [
+                "老王（擦着擀面杖）：武大家的？稀客啊，你家那矮子今天怎舍得让娇妻抛头露面？",
+                "潘金莲：王大哥说笑了，奴家来问问前日您说要买我家祖传和面方子的事...",
+                {"关键提示": "老王右手虎口有新鲜抓痕"},
+            ],
+            "老王察觉潘金莲异常神色": [
+                "老王（突然逼近）：你袖口沾的可是石灰？今早西巷棺材铺刚运走三袋。",
+                "潘金莲（后退半步）：王大哥真会说笑，这是...揉面沾的面粉。",
+                {"收集关键线索": "老王注意到潘金莲袖口异常"},
+            ],
+            "潘金莲试图用砒霜栽赃老王": [
+                "潘金莲（掏出纸包）：其实奴家是想问问，王大哥面案下藏的砒霜可要分些与奴家？",
+                "老王（拍案而起）：好个毒妇！昨日武大说要去县衙告我强占摊位，今早就...",
+                {"关键提示": "蒸笼后闪过烧饼铺伙计的身影"},
+            ],
+            "老王反咬潘金莲通奸之事": [
+                "老王（阴笑）：上月廿八未时，西门大官人的马车在你家后巷停了一炷香。",
+                "潘金莲（脸色煞白）：你...你血口喷人！",
+                {"收集关键线索": "老王掌握潘金莲与西门庆私会证据"},
+            ],
+            "烧饼铺伙计目击争执": [
+                "伙计（突然插话）：掌柜的，武家娘子方才在面缸旁鬼鬼祟祟...",
+                "潘金莲（猛然转身）：休得胡言！",
+                {"关键提示": "面缸边缘有白色粉末洒落"},
+            ],
+        },
+        "交互": {
+            "对话": [
+                "潘金莲提及摊位纠纷$语义1 (武大郎这两天和隔壁老王产生过巨大矛盾)",
+                "老王暗示知晓武大郎死亡真相$语义2 (老王注意到潘金莲袖口异常)",
+                "烧饼铺伙计指认可疑行为$语义3 (面缸边缘有白色粉末洒落)",
+            ],
+            "动作选择": [
+                "摔碎毒药瓶诬陷老王$1 (潘金莲试图用砒霜栽赃老王)",
+                "谎称武大郎去县衙告状$2 (潘金莲提及摊位纠纷$语义1)",
+                "用西门庆势力威胁老王$3 (老王掌握潘金莲与西门庆私会证据)",
+                "借口取面粉查看面缸$4 (烧饼铺伙计指认可疑行为$语义3)",
+            ],
+        },
+        "触发": {
+            "摔碎毒药瓶诬陷老王$1": {
+                "叙事": "你故意打翻砒霜纸包，白色粉末飘向正在发酵的面团。",
+                "收集关键线索": "老王的面团沾染不明粉末",
+                "跳转": "结局18",
             },
-            "结局18": {
-                "流": "老王的面团被验出砒霜，但在衙役搜查时发现你袖中相同的药包纸，最终两人以互投毒罪收监。"
+            "谎称武大郎去县衙告状$2": {
+                "叙事": "你声称武大郎正在县衙办理摊位过户文书，老王抄起砍骨刀冲向衙门。",
+                "收集关键线索": "老王持凶器前往县衙",
+                "跳转": "场景大街",
             },
-        }
+            "用西门庆势力威胁老王$3": {
+                "叙事": "你暗示西门庆会处理多嘴之人，老王狂笑着掀开藏着账本的面缸。",
+                "收集关键线索": "发现老王走私面粉的暗账",
+                "跳转": "场景西门庆家",
+            },
+            "借口取面粉查看面缸$4": {
+                "叙事": "你假装查看面粉质量，将武大郎的鞋底碎布塞入缸底。",
+                "收集关键线索": "老王面缸发现武大郎衣物残片",
+                "跳转": "场景衙门",
+            },
+        },
+    },
+    "结局18": {
+        "流": "老王的面团被验出砒霜，但在衙役搜查时发现你袖中相同的药包纸，最终两人以互投毒罪收监。"
+    },
+}
 
 
-SCENE_GEN_PROMPT_TEMP = """
+SCENE_GEN_INSTRUCTIONS = """
 你是一个专业的剧本作家，需要根据给定的游戏历史和当前剧本生成新的场景。请严格按照以下格式生成剧本：
 
 当前剧本：
@@ -368,7 +521,9 @@ SCENE_GEN_PROMPT_TEMP = """
    - 提供有意义的剧情发展
    - 保持悬疑感和戏剧性
 
-请按照以下JSON格式输出：
+"""
+
+SCENE_GEN_FORMAT = """请按照以下JSON格式输出：
 {{
     "场景名称": {{
         "场景": "场景描述",
@@ -451,22 +606,9 @@ SCENE_GEN_PROMPT_TEMP = """
 }}
 """
 
-SCENE_EVAL_PROMPT_TEMP = """
-你是一个专业的剧本评估专家，需要评估新生成的场景与原有剧情及玩家历史的关联性。请根据以下标准进行评分：
+SCENE_GEN_PROMPT_TEMP = SCENE_GEN_INSTRUCTIONS + SCENE_GEN_FORMAT
 
-当前剧本：
-{script}
-
-玩家游戏历史：
-- 历史剧情：{plot_history}
-- 历史线索：{clue_history}
-- 历史提示：{hint_history}
-- 历史交互：{interaction_history}
-
-新生成的场景：
-{new_scene}
-
-评分标准（0-5分）：
+SCENE_EVAL_CRITERIA = """评分标准（0-5分）：
 0分：完全无关，与原有剧情和玩家历史毫无联系
 1分：勉强相关，只有少量元素与原有剧情或玩家历史有关
 2分：部分相关，能利用部分历史线索和剧情发展
@@ -494,7 +636,24 @@ SCENE_EVAL_PROMPT_TEMP = """
    - 是否推动故事向前发展
    - 是否保持悬疑感和戏剧性
    - 是否提供有意义的剧情选择
+"""
+
+SCENE_EVAL_PROMPT_TEMP = """
+你是一个专业的剧本评估专家，需要评估新生成的场景与原有剧情及玩家历史的关联性。请根据以下标准进行评分：
+
+当前剧本：
+{script}
+
+玩家游戏历史：
+- 历史剧情：{plot_history}
+- 历史线索：{clue_history}
+- 历史提示：{hint_history}
+- 历史交互：{interaction_history}
 
+新生成的场景：
+{new_scene}
+
+""" + SCENE_EVAL_CRITERIA + """
 请按照以下JSON格式输出评分：
 {{
     "score": 分数,
@@ -507,3 +666,107 @@ SCENE_EVAL_PROMPT_TEMP = """
     "reason": "新场景很好地利用了玩家收集的线索，特别是关于老王与武大郎的矛盾。剧情发展自然，通过烧饼铺的场景展现了新的矛盾点。人物性格保持一致，对话风格统一。唯一不足是结局略显仓促，可以进一步展开。"
 }}
 """
+
+SCENE_GEN_EVAL_PROMPT_TEMP = SCENE_GEN_INSTRUCTIONS + """生成场景后，请以专业剧本评估专家的身份，评估你生成的场景与原有剧情及玩家历史的关联性：
+
+""" + SCENE_EVAL_CRITERIA + """
+请将生成的场景与评分合并为以下JSON格式输出，场景放在"scene"中，评分放在"evaluation"中：
+{{
+    "scene": {{
+        "场景名称": {{
+            "场景": "场景描述",
+            "人物": "人物描述",
+            "情节链": ["情节1", "情节2", ...],
+            "流": {{
+                "情节1": [
+                    "对话1",
+                    "对话2",
+                    {{"关键提示": "提示内容"}},
+                    {{"收集关键线索": "线索内容"}}
+                ]
+            }},
+            "交互": {{
+                "对话": [
+                    "对话选项1$语义1 (触发条件1)",
+                    "对话选项2$语义2 (触发条件2)"
+                ],
+                "动作选择": [
+                    "动作1$1 (触发条件1)",
+                    "动作2$2 (触发条件2)"
+                ]
+            }},
+            "触发": {{
+                "动作1$1": {{
+                    "叙事": "触发后的叙事内容",
+                    "收集关键线索": "新的线索",
+                    "跳转": "下一个场景"
+                }}
+            }}
+        }}
+    }},
+    "evaluation": {{
+        "score": 分数,
+        "reason": "评分理由，包括对各个维度的具体分析"
+    }}
+}}
+
+如果剧情需要结局，则在"scene"中额外添加结局场景：
+{{
+    "结局XX": {{
+        "流": "结局的完整描述"
+    }}
+}}
+
+示例：
+1. 普通场景：
+{{
+    "scene": {{
+        "场景老王烧饼铺": {{
+            "场景": "地点：老王烧饼铺\\n时间：上午十点\\n你来到隔壁老王的烧饼铺，蒸笼冒着热气却未见武大郎的摊位。",
+            "人物": "老王。隔壁老王四十余岁，满脸横肉，手臂有烫伤疤痕。因摊位纠纷与武大郎积怨已久，近日正在争夺早市黄金摊位。",
+            "情节链": ["潘金莲试探老王与武大郎的矛盾", "老王察觉潘金莲异常神色"],
+            "流": {{
+                "潘金莲试探老王与武大郎的矛盾": [
+                    "老王（擦着擀面杖）：武大家的？稀客啊，你家那矮子今天怎舍得让娇妻抛头露面？",
+                    "潘金莲：王大哥说笑了，奴家来问问前日您说要买我家祖传和面方子的事...",
+                    {{"关键提示": "老王右手虎口有新鲜抓痕"}}
+                ]
+            }},
+            "交互": {{
+                "对话": [
+                    "潘金莲提及摊位纠纷$语义1 (武大郎这两天和隔壁老王产生过巨大矛盾)",
+                    "老王暗示知晓武大郎死亡真相$语义2 (老王注意到潘金莲袖口异常)"
+                ],
+                "动作选择": [
+                    "摔碎毒药瓶诬陷老王$1 (潘金莲试图用砒霜栽赃老王)",
+                    "谎称武大郎去县衙告状$2 (潘金莲提及摊位纠纷$语义1)"
+                ]
+            }},
+            "触发": {{
+                "摔碎毒药瓶诬陷老王$1": {{
+                    "叙事": "你故意打翻砒霜纸包，白色粉末飘向正在发酵的面团。",
+                    "收集关键线索": "老王的面团沾染不明粉末",
+                    "跳转": "结局18"
+                }}
+            }}
+        }}
+    }},
+    "evaluation": {{
+        "score": 4,
+        "reason": "新场景很好地利用了玩家收集的线索，特别是关于老王与武大郎的矛盾。剧情发展自然，通过烧饼铺的场景展现了新的矛盾点。人物性格保持一致，对话风格统一。"
+    }}
+}}
+
+2. 结局场景（仅在需要时生成）：
+{{
+    "scene": {{
+        "结局18": {{
+            "流": "老王的面团被验出砒霜，但在衙役搜查时发现你袖中相同的药包纸，最终两人以互投毒罪收监。"
+        }}
+    }},
+    "evaluation": {{
+        "score": 3,
+        "reason": "结局承接了砒霜栽赃的线索，但收尾较仓促，人物动机可以进一步展开。"
+    }}
+}}
+"""
@@ -0,0 +1,34 @@
+import sys
+
+sys.path.insert(0, sys.path[0] + "/../")
+
+from code.cache import LLMCache
+
+
+def test_exact_cache():
+    """
+    测试精确匹配缓存（不依赖网络）
+    """
+    cache = LLMCache(max_size=2)
+    assert cache.get("m:EvaluationOutput:evaluate", "提示词") is None
+
+    cache.set("m:EvaluationOutput:evaluate", "提示词", {"score": 4, "reason": "合理"})
+    assert cache.get("m:EvaluationOutput:evaluate", "提示词") == {"score": 4, "reason": "合理"}
+    # 不同命名空间（如不同变体）互不命中
+    assert cache.get("m:EvaluationOutput:0-1", "提示词") is None
+
+    # 返回副本，调用方修改不影响缓存
+    cache.get("m:EvaluationOutput:evaluate", "提示词")["score"] = 0
+    assert cache.get("m:EvaluationOutput:evaluate", "提示词")["score"] == 4
+
+    # 超出容量时淘汰最久未使用的条目
+    cache.set("ns", "a", 1)
+    cache.set("ns", "b", 2)
+    assert cache.get("m:EvaluationOutput:evaluate", "提示词") is None
+    assert cache.get("ns", "a") == 1 and cache.get("ns", "b") == 2
+
+    print("测试通过！")
+
+
+if __name__ == "__main__":
+    test_exact_cache()
@@ -0,0 +1,103 @@
+import asyncio
+import sys
+
+sys.path.insert(0, sys.path[0] + "/../")
+
+from code.scriptwriter import MCTSGenerator
+
+
+class StubAgent:
+    """
+    不调用LLM的编剧智能体桩：每次生成返回一个新场景及固定评分
+    """
+
+    def __init__(self, score):
+        self.score = score
+        self.calls = 0
+
+    def _format_context(self, script, gamelog):
+        return {}
+
+    async def _generate_and_evaluate_scene(self, context, variant=None):
+        await asyncio.sleep(0)
+        self.calls += 1
+        return {f"场景{self.calls}": {"场景": f"变体{variant}"}}, self.score
+
+    async def _evaluate_scene(self, new_scene, context):
+        self.calls += 1
+        return self.score
+
+
+class RecordingGenerator(MCTSGenerator):
+    """
+    记录根节点以便搜索结束后检查搜索树，并限制选择次数
+    """
+
+    max_selects = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.root = None
+        self.selects = 0
+
+    def _select(self, root):
+        self.root = root
+        self.selects += 1
+        # 搜索卡死（如反复选择已达最大深度的节点）时失败，而非无限循环
+        assert self.selects <= self.max_selects, "选择阶段未能结束"
+        return super()._select(root)
+
+
+def iter_nodes(node):
+    yield node
+    for child in node.children:
+        yield from iter_nodes(child)
+
+
+async def run_search(agent, max_iterations, early_stop_threshold):
+    """执行一次搜索，返回(生成器, 结果)"""
+    generator = RecordingGenerator(agent, early_stop_threshold=early_stop_threshold)
+    generator.max_iterations = max_iterations
+    scene = await generator.generate_scene({}, {})
+    return generator, scene
+
+
+async def test_exhausted_tree():
+    """
+    测试整棵树到达最大深度后搜索结束，且虚拟损失全部撤销、模型调用次数准确
+    """
+    agent = StubAgent(score=3)
+    generator, scene = await run_search(agent, max_iterations=1000, early_stop_threshold=6)
+    nodes = list(iter_nodes(generator.root))
+
+    assert scene is not None
+    # 最大深度以内的节点全部展开
+    assert max(node.depth for node in nodes) == generator.max_depth
+    assert len(nodes) == sum(generator.branching ** d for d in range(generator.max_depth + 1))
+    assert all(node.pending == 0 for node in nodes)
+    # 每个非根节点对应一次生成（含评估）调用，不再单独评估
+    assert generator.model_calls == agent.calls == len(nodes) - 1
+
+    print("测试通过！")
+
+
+async def test_early_stop():
+    """
+    测试评分全为5分时提前结束搜索
+    """
+    full_agent = StubAgent(score=5)
+    await run_search(full_agent, max_iterations=1000, early_stop_threshold=6)
+
+    agent = StubAgent(score=5)
+    generator, _ = await run_search(agent, max_iterations=1000, early_stop_threshold=4.5)
+
+    assert agent.calls < full_agent.calls
+    assert generator.model_calls == agent.calls
+    assert all(node.pending == 0 for node in iter_nodes(generator.root))
+
+    print("测试通过！")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_exhausted_tree())
+    asyncio.run(test_early_stop())
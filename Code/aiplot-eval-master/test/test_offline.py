@@ -18,7 +18,8 @@ async def play(agent, inputs=None, action=None):
             "To" + agent.script[agent.curr_scene]["人物"].split("。")[0] + "：" + inputs
         )
         # 通过两种方式更新代理状态（可能需要根据不同情况处理）
-        api = await agent.update_by_user_input_1(inputs)
+        # 两者不能并发：_2基于_1写入的当前剧情（curr_plot）及触发结果判断情节推进，只使用_2的返回
+        await agent.update_by_user_input_1(inputs)
         api = await agent.update_by_user_input_2(inputs)
     # 处理执行动作的情况
     elif action is not None:
@@ -76,17 +77,17 @@ async def run_once(retry=3):
                     api = await play(agent, inputs=inputs, action=None)
                 # 处理动作互动
                 elif interaction == "动作":
+                    action_space = api["action_space"]
                     # 优先处理特殊动作"离开$1"
-                    if "离开$1" not in api["action_space"]:
-                        action = random.choice(api["action_space"])
+                    if "离开$1" not in action_space:
+                        action = random.choice(action_space)
                     else:
                         # 20%概率选择离开，否则选其他动作
                         if random.random() <= 0.2:
                             action = "离开$1"
                         else:
-                            action_space = list(
-                                set(api["action_space"]) - set(["离开$1"])
-                            )
+                            # 保持原有顺序，便于复现测评结果
+                            action_space = [a for a in action_space if a != "离开$1"]
                             if len(action_space) == 0:
                                 action = "离开$1"
                             else: